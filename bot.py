@@ -3,17 +3,28 @@ from __future__ import annotations
 import asyncio
 import datetime as dt
 import logging
+import math
 import calendar
+import collections
+import functools
 import os
-from typing import Any, Dict, Optional, Set
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Final, Optional, Set, Tuple
 import io
 
 import httpx
+try:
+    # orjson is optional; stdlib json also accepts the raw response bytes
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 from aiogram import Bot, Dispatcher, Router
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.types import BufferedInputFile
 from aiogram.utils.chat_action import ChatActionSender
+from PIL import Image, ImageDraw, ImageFont
 from zoneinfo import ZoneInfo
 
 
@@ -50,7 +61,32 @@ def parse_allowed_chat_ids(value: Optional[str]) -> Optional[Set[int]]:
     return items or None
 
 
+@functools.lru_cache(maxsize=None)
+def _load_timezone(tz_name: str) -> dt.tzinfo:
+    try:
+        return ZoneInfo(tz_name)
+    except Exception:
+        logger.warning("Invalid TIMEZONE '%s'; falling back to UTC", tz_name)
+        return dt.UTC
+
+
 class Settings:
+    __slots__ = (
+        "decodo_api_key",
+        "telegram_bot_token",
+        "telegram_allowed_chat_ids",
+        "decodo_service_type",
+        "mapped_proxy_type",
+        "proxy_type_candidates",
+        "subscription_limit_gb",
+        "subscription_start_date",
+        "subscription_end_date",
+        "subscription_start_date_parsed",
+        "subscription_end_date_parsed",
+        "timezone",
+        "timezone_name",
+    )
+
     def __init__(self) -> None:
         load_env()
         self.decodo_api_key: str = os.getenv("DECODO_API_KEY", "")
@@ -59,6 +95,8 @@ class Settings:
             os.getenv("TELEGRAM_ALLOWED_CHAT_IDS")
         )
         self.decodo_service_type: Optional[str] = os.getenv("DECODO_SERVICE_TYPE", "mobile_proxies")
+        self.mapped_proxy_type: Optional[str] = _map_service_to_proxy_type(self.decodo_service_type)
+        self.proxy_type_candidates: Tuple[Optional[str], ...] = _build_proxy_type_candidates(self.decodo_service_type)
 
         # Optional: provide subscription details via env (no calls to subscriptions endpoint)
         limit_str = os.getenv("DECODO_SUBSCRIPTION_LIMIT_GB")
@@ -69,14 +107,16 @@ class Settings:
             self.subscription_limit_gb = None
         self.subscription_start_date: Optional[str] = os.getenv("DECODO_SUBSCRIPTION_START_DATE") or None
         self.subscription_end_date: Optional[str] = os.getenv("DECODO_SUBSCRIPTION_END_DATE") or None
+        self.subscription_start_date_parsed: Optional[dt.date] = (
+            _parse_date_guess(self.subscription_start_date) if self.subscription_start_date else None
+        )
+        self.subscription_end_date_parsed: Optional[dt.date] = (
+            _parse_date_guess(self.subscription_end_date) if self.subscription_end_date else None
+        )
 
         # Timezone for display (not for API queries which stay in UTC)
         tz_name = os.getenv("TIMEZONE") or os.getenv("TZ") or "UTC"
-        try:
-            self.timezone: dt.tzinfo = ZoneInfo(tz_name)
-        except Exception:
-            logger.warning("Invalid TIMEZONE '%s'; falling back to UTC", tz_name)
-            self.timezone = dt.UTC
+        self.timezone: dt.tzinfo = _load_timezone(tz_name)
         self.timezone_name: str = tz_name
 
     def ensure_valid(self) -> None:
@@ -89,39 +129,142 @@ class Settings:
             raise RuntimeError(f"Missing required env vars: {', '.join(missing)}")
 
 
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return process-wide settings; the environment is read only once."""
+    return Settings()
+
+
 # -----------------------------
 # Decodo API client (async)
 # -----------------------------
 DECODO_BASE = "https://api.decodo.com"
 
+# Usage numbers change slowly; identical traffic queries within this window reuse the last response
+TRAFFIC_CACHE_TTL = 60.0
+TRAFFIC_CACHE_MAXSIZE = 32
+
+# Decodo reports bytes; usage is shown in decimal GB
+BYTES_PER_GB = 1_000_000_000.0
+
+
+# Keep a few connections warm across idle periods; HTTP/2 multiplexes concurrent probes
+DECODO_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=16, keepalive_expiry=300)
+
+
+def new_http_client(timeout: float = 15.0) -> httpx.AsyncClient:
+    """Create the HTTP client used for Decodo API calls."""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(timeout, connect=5.0),
+        limits=DECODO_HTTP_LIMITS,
+    )
+
+
+def _format_api_ts(ts: dt.datetime) -> str:
+    # Format without timezone per API examples (timestamps are UTC)
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _to_api_ts(date_str: str, end_of_day: bool = False) -> str:
+    # Accept YYYY-MM-DD and expand to full timestamp in UTC (no TZ suffix per API examples)
+    date_str = date_str.strip()
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        return f"{date_str} {'23:59:59' if end_of_day else '00:00:00'}"
+    # If already a timestamp-like string, pass through
+    return date_str
+
+
+# (minute since epoch, start-of-month, now) API strings for the current-month window
+_cached_month_bounds: Optional[Tuple[int, str, str]] = None
+
+
+def _current_month_window() -> Tuple[str, str]:
+    """Return API (from, to) timestamps for the current month up to now.
+
+    "Now" has minute granularity (see _utc_now), so the strings are reused
+    until the minute changes.
+    """
+    global _cached_month_bounds
+    minute = int(time.time()) // 60
+    if _cached_month_bounds is None or _cached_month_bounds[0] != minute:
+        # Use UTC to match Decodo docs (timestamps are treated as UTC)
+        now = dt.datetime.fromtimestamp(minute * 60, dt.UTC)
+        start_dt = now.replace(day=1, hour=0, minute=0, second=0)
+        _cached_month_bounds = (minute, _format_api_ts(start_dt), _format_api_ts(now))
+    return _cached_month_bounds[1], _cached_month_bounds[2]
+
+
+@functools.lru_cache(maxsize=4)
+def _local_month_dates(tz: dt.tzinfo, minute: int) -> Tuple[str, str]:
+    """Return (first day of month, today) as YYYY-MM-DD in tz for the given epoch minute."""
+    today = dt.datetime.fromtimestamp(minute * 60, tz).date()
+    return today.replace(day=1).isoformat(), today.isoformat()
+
+
+def _utc_now() -> dt.datetime:
+    """Current UTC time truncated to the minute.
+
+    Query windows that end "now" then stay identical for a minute, so repeated
+    commands can be served from the traffic cache.
+    """
+    return dt.datetime.now(dt.UTC).replace(second=0, microsecond=0)
+
 
 class DecodoClient:
-    def __init__(self, api_key: str, *, timeout: float = 15.0):
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 15.0,
+        traffic_cache_ttl: float = TRAFFIC_CACHE_TTL,
+    ):
         # Public API expects raw API key in Authorization header (no Bearer prefix)
         auth_value = api_key.strip()
         self._headers = {
             "Accept": "application/json",
             "Authorization": auth_value,
         }
-        self._client = httpx.AsyncClient(headers=self._headers, timeout=timeout)
+        # Reuse a caller-owned client when given so connections stay pooled across requests.
+        # Headers go on each request so clients sharing a pool never see each other's key.
+        self._owns_client = client is None
+        if client is None:
+            client = new_http_client(timeout)
+        self._client = client
+        # (proxyType, startDate, endDate, groupBy) -> (stored_at, response)
+        self._traffic_cache: Dict[Tuple[Optional[str], ...], Tuple[float, Dict[str, Any]]] = {}
+        self._traffic_cache_ttl = traffic_cache_ttl
+
+    def _cache_traffic(self, key: Tuple[Optional[str], ...], data: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        cache = self._traffic_cache
+        for k in [k for k, (stored_at, _) in cache.items() if now - stored_at >= self._traffic_cache_ttl]:
+            del cache[k]
+        cache[key] = (now, data)
+        while len(cache) > TRAFFIC_CACHE_MAXSIZE:
+            # dicts keep insertion order: drop the oldest entry
+            del cache[next(iter(cache))]
 
     async def aclose(self) -> None:
-        await self._client.aclose()
+        if self._owns_client:
+            await self._client.aclose()
 
     async def get_subscriptions(self) -> Dict[str, Any]:
         """GET /v2/subscriptions"""
         url = f"{DECODO_BASE}/v2/subscriptions"
-        r = await self._client.get(url)
+        r = await self._client.get(url, headers=self._headers)
         try:
             r.raise_for_status()
         except httpx.HTTPStatusError as e:
             # This endpoint may be unsupported for some accounts; keep logs quiet.
-            if e.response is not None:
-                logger.debug("Subscriptions error %s: %s", e.response.status_code, e.response.text)
-            else:
-                logger.debug("Subscriptions error: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                if e.response is not None:
+                    logger.debug("Subscriptions error %s: %s", e.response.status_code, e.response.text)
+                else:
+                    logger.debug("Subscriptions error: %s", e)
             raise
-        return r.json()
+        return _json_loads(r.content)
 
     async def get_sub_users(self, *, service_type: Optional[str] = None) -> Dict[str, Any] | list[Dict[str, Any]]:
         """GET /v2/sub-users — available for Residential subscriptions.
@@ -131,16 +274,17 @@ class DecodoClient:
         params: Dict[str, Any] = {}
         if service_type:
             params["service_type"] = service_type
-        r = await self._client.get(url, params=params)
+        r = await self._client.get(url, params=params, headers=self._headers)
         try:
             r.raise_for_status()
         except httpx.HTTPStatusError as e:
-            if e.response is not None:
-                logger.debug("Sub-users error %s: %s", e.response.status_code, e.response.text)
-            else:
-                logger.debug("Sub-users error: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                if e.response is not None:
+                    logger.debug("Sub-users error %s: %s", e.response.status_code, e.response.text)
+                else:
+                    logger.debug("Sub-users error: %s", e)
             raise
-        return r.json()
+        return _json_loads(r.content)
 
     async def get_sub_user_traffic(
         self,
@@ -162,16 +306,17 @@ class DecodoClient:
             params["to"] = to_date
         if service_type:
             params["service_type"] = service_type
-        r = await self._client.get(url, params=params)
+        r = await self._client.get(url, params=params, headers=self._headers)
         try:
             r.raise_for_status()
         except httpx.HTTPStatusError as e:
-            if e.response is not None:
-                logger.debug("Sub-user traffic error %s: %s", e.response.status_code, e.response.text)
-            else:
-                logger.debug("Sub-user traffic error: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                if e.response is not None:
+                    logger.debug("Sub-user traffic error %s: %s", e.response.status_code, e.response.text)
+                else:
+                    logger.debug("Sub-user traffic error: %s", e)
             raise
-        return r.json()
+        return _json_loads(r.content)
 
     async def get_allocated_traffic_limit(self, *, service_type: Optional[str] = None) -> Dict[str, Any]:
         """GET /v2/allocated-traffic-limit — allocated traffic across all sub users (Residential)."""
@@ -179,16 +324,17 @@ class DecodoClient:
         params: Dict[str, Any] = {}
         if service_type:
             params["service_type"] = service_type
-        r = await self._client.get(url, params=params)
+        r = await self._client.get(url, params=params, headers=self._headers)
         try:
             r.raise_for_status()
         except httpx.HTTPStatusError as e:
-            if e.response is not None:
-                logger.debug("Allocated traffic error %s: %s", e.response.status_code, e.response.text)
-            else:
-                logger.debug("Allocated traffic error: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                if e.response is not None:
+                    logger.debug("Allocated traffic error %s: %s", e.response.status_code, e.response.text)
+                else:
+                    logger.debug("Allocated traffic error: %s", e)
             raise
-        return r.json()
+        return _json_loads(r.content)
 
     async def get_traffic(
         self,
@@ -217,28 +363,50 @@ class DecodoClient:
         else:
             # Decodo requires groupBy; default to 'day' for month-to-date summaries
             payload["groupBy"] = "day"
-        r = await self._client.post(url, json=payload)
+        key = (payload.get("proxyType"), payload.get("startDate"), payload.get("endDate"), payload["groupBy"])
+        cached = self._traffic_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self._traffic_cache_ttl:
+            return cached[1]
+        r = await self._client.post(url, json=payload, headers=self._headers)
         try:
             r.raise_for_status()
         except httpx.HTTPStatusError as e:
-            # Log response details to diagnose 400s from API (e.g., required fields, wrong enums)
-            logger.error(
-                "Decodo traffic error %s: payload=%s response=%s",
+            # 400s are expected while probing proxyType candidates; the body is only decoded for debug logs
+            logger.warning(
+                "Decodo traffic error %s: payload=%s response_bytes=%d",
                 e.response.status_code,
                 payload,
-                e.response.text,
+                len(e.response.content),
             )
+            if logger.isEnabledFor(logging.DEBUG):
+                # Response details help diagnose 400s from API (e.g., required fields, wrong enums)
+                logger.debug("Decodo traffic error body: %s", e.response.text)
             raise
-        return r.json()
+        data = _json_loads(r.content)
+        self._cache_traffic(key, data)
+        return data
 
     async def get_current_month_usage(self, *, type_: Optional[str] = None) -> Dict[str, Any]:
-        # Use UTC to match Decodo docs (timestamps are treated as UTC)
-        now = dt.datetime.now(dt.UTC).replace(microsecond=0)
-        start_dt = now.replace(day=1, hour=0, minute=0, second=0)
-        def fmt(ts: dt.datetime) -> str:
-            # Format without timezone per API examples (timestamps are UTC)
-            return ts.strftime("%Y-%m-%d %H:%M:%S")
-        return await self.get_traffic(from_date=fmt(start_dt), to_date=fmt(now), type_=type_)
+        from_date, to_date = _current_month_window()
+        return await self.get_traffic(from_date=from_date, to_date=to_date, type_=type_)
+
+
+_SERVICE_MAP: Final[Dict[str, str]] = {
+    # Proxies
+    "residential": "residential_proxies",
+    "residential_proxies": "residential_proxies",
+    "mobile": "mobile_proxies",
+    "mobile_proxies": "mobile_proxies",
+    "datacenter": "datacenter_proxies",
+    "datacenter_proxies": "datacenter_proxies",
+    # Web Scraping API (RTC)
+    "rtc_universal_proxies": "rtc_universal_proxies",
+    "rtc_universal_core_proxies": "rtc_universal_core_proxies",
+    # Site Unblocker
+    "site_unblocker": "rtc_site_unblocker_proxies",
+    "rtc_site_unblocker_proxies": "rtc_site_unblocker_proxies",
+    "rtc_site_unblocker_req_proxies": "rtc_site_unblocker_req_proxies",
+}
 
 
 def _map_service_to_proxy_type(value: Optional[str]) -> Optional[str]:
@@ -254,23 +422,7 @@ def _map_service_to_proxy_type(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
     v = value.strip().lower()
-    mapping = {
-        # Proxies
-        "residential": "residential_proxies",
-        "residential_proxies": "residential_proxies",
-        "mobile": "mobile_proxies",
-        "mobile_proxies": "mobile_proxies",
-        "datacenter": "datacenter_proxies",
-        "datacenter_proxies": "datacenter_proxies",
-        # Web Scraping API (RTC)
-        "rtc_universal_proxies": "rtc_universal_proxies",
-        "rtc_universal_core_proxies": "rtc_universal_core_proxies",
-        # Site Unblocker
-        "site_unblocker": "rtc_site_unblocker_proxies",
-        "rtc_site_unblocker_proxies": "rtc_site_unblocker_proxies",
-        "rtc_site_unblocker_req_proxies": "rtc_site_unblocker_req_proxies",
-    }
-    return mapping.get(v, v)
+    return _SERVICE_MAP.get(v, v)
 
 def _first_mapping_candidate(obj: Any) -> Optional[Dict[str, Any]]:
     """Return the first dict-like node from various response shapes."""
@@ -281,46 +433,24 @@ def _first_mapping_candidate(obj: Any) -> Optional[Dict[str, Any]]:
     return None
 
 
-def _extract_subs_info(subscriptions: Dict[str, Any] | list[Dict[str, Any]] | None) -> Dict[str, Any]:
-    """Best-effort extraction for subscription details across possible schemas."""
-    info: Dict[str, Any] = {
-        "limit": None,
-        "used": None,
-        "period_start": None,
-        "period_end": None,
-        "plan": None,
-    }
-    if not isinstance(subscriptions, (dict, list)):
-        return info
-
-    roots: list[Any] = [subscriptions]
-    if isinstance(subscriptions, dict):
-        for k in ("data", "subscription", "result"):
-            if k in subscriptions:
-                roots.append(subscriptions[k])
-
-    candidates: list[Dict[str, Any]] = []
-    for r in roots:
-        n = _first_mapping_candidate(r)
-        if n:
-            candidates.append(n)
-
-    keys_limit = (
+# Subscription field -> accepted response keys, most preferred first
+_SUBS_FIELD_KEYS: Final[Dict[str, Tuple[str, ...]]] = {
+    "limit": (
         "traffic_limit",
         "limit",
         "data_limit",
         "max_traffic",
         "max_usage",
         "max",
-    )
-    keys_used = (
+    ),
+    "used": (
         "traffic_per_period",
         "used",
         "usage",
         "traffic_used",
         "data_used",
-    )
-    keys_start = (
+    ),
+    "period_start": (
         "current_period_start",
         "period_start",
         "start_date",
@@ -328,8 +458,8 @@ def _extract_subs_info(subscriptions: Dict[str, Any] | list[Dict[str, Any]] | No
         "from",
         "startAt",
         "start_at",
-    )
-    keys_end = (
+    ),
+    "period_end": (
         "current_period_end",
         "period_end",
         "end_date",
@@ -341,45 +471,89 @@ def _extract_subs_info(subscriptions: Dict[str, Any] | list[Dict[str, Any]] | No
         "renews_at",
         "valid_until",
         "expires_at",
-    )
-    keys_plan = ("plan", "name", "subscription_plan", "package_name")
+    ),
+    "plan": ("plan", "name", "subscription_plan", "package_name"),
+}
+# Response key -> (field, rank); a lower rank wins when a node carries several aliases
+_SUBS_KEY_ALIASES: Final[Dict[str, Tuple[str, int]]] = {
+    key: (field, rank) for field, keys in _SUBS_FIELD_KEYS.items() for rank, key in enumerate(keys)
+}
+_SUBS_NUMERIC_FIELDS: Final[frozenset[str]] = frozenset({"limit", "used"})
+
+
+def _extract_subs_info(subscriptions: Dict[str, Any] | list[Dict[str, Any]] | None) -> Dict[str, Any]:
+    """Best-effort extraction for subscription details across possible schemas."""
+    info: Dict[str, Any] = {
+        "limit": None,
+        "used": None,
+        "period_start": None,
+        "period_end": None,
+        "plan": None,
+    }
+    if not isinstance(subscriptions, (dict, list)):
+        return info
+
+    roots: list[Any] = [subscriptions]
+    if isinstance(subscriptions, dict):
+        for k in ("data", "subscription", "result"):
+            if k in subscriptions:
+                roots.append(subscriptions[k])
+
+    candidates: list[Dict[str, Any]] = []
+    for r in roots:
+        n = _first_mapping_candidate(r)
+        if n:
+            candidates.append(n)
 
     for node in candidates:
-        if info["limit"] is None:
-            for k in keys_limit:
-                if k in node and node[k] is not None:
-                    try:
-                        info["limit"] = float(node[k])
-                    except (TypeError, ValueError):
-                        info["limit"] = node[k]
-                    break
-        if info["used"] is None:
-            for k in keys_used:
-                if k in node and node[k] is not None:
-                    try:
-                        info["used"] = float(node[k])
-                    except (TypeError, ValueError):
-                        info["used"] = node[k]
-                    break
-        if info["period_start"] is None:
-            for k in keys_start:
-                if k in node and node[k]:
-                    info["period_start"] = str(node[k])
-                    break
-        if info["period_end"] is None:
-            for k in keys_end:
-                if k in node and node[k]:
-                    info["period_end"] = str(node[k])
-                    break
-        if info["plan"] is None:
-            for k in keys_plan:
-                if k in node and node[k]:
-                    info["plan"] = str(node[k])
-                    break
+        # Single pass over the node; per field keep the alias that ranks highest
+        best: Dict[str, Tuple[int, Any]] = {}
+        for k, v in node.items():
+            alias = _SUBS_KEY_ALIASES.get(k)
+            if alias is None:
+                continue
+            field, rank = alias
+            if info[field] is not None:
+                continue
+            # Numeric fields accept any non-None value (0 included); text fields need a truthy one
+            if (v is None) if field in _SUBS_NUMERIC_FIELDS else (not v):
+                continue
+            if field not in best or rank < best[field][0]:
+                best[field] = (rank, v)
+        for field, (_, v) in best.items():
+            if field in _SUBS_NUMERIC_FIELDS:
+                try:
+                    info[field] = float(v)
+                except (TypeError, ValueError):
+                    info[field] = v
+            else:
+                info[field] = str(v)
 
     return info
 
 
+_ISO_DATE_RE: Final[re.Pattern[str]] = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _date_only_text(val: Optional[str]) -> Optional[str]:
+    if not val:
+        return None
+    s = str(val).strip()
+    # prefer the leading YYYY-MM-DD; otherwise return the original string
+    m = _ISO_DATE_RE.match(s)
+    return m.group(1) if m else s
+
+
 def format_usage(
     subscriptions: Dict[str, Any] | list[Dict[str, Any]] | None,
     traffic: Dict[str, Any],
@@ -388,36 +562,9 @@ def format_usage(
     proxy_type: Optional[str] = None,
     tz: Optional[dt.tzinfo] = None,
 ) -> str:
-    limit = None
-    used = None
-
-    if isinstance(subscriptions, dict):
-        limit = subscriptions.get("traffic_limit") or subscriptions.get("limit")
-        used_period = subscriptions.get("traffic_per_period")
-        if used_period is not None and used is None:
-            try:
-                used = float(used_period)
-            except (TypeError, ValueError):
-                used = None
-        for key in ("data", "subscription", "result"):
-            if key in subscriptions and isinstance(subscriptions[key], dict):
-                limit = limit or subscriptions[key].get("traffic_limit")
-                used_period = subscriptions[key].get("traffic_per_period")
-                if used is None and used_period is not None:
-                    try:
-                        used = float(used_period)
-                    except (TypeError, ValueError):
-                        used = None
-    elif isinstance(subscriptions, list) and subscriptions:
-        first = subscriptions[0]
-        if isinstance(first, dict):
-            limit = first.get("traffic_limit")
-            used_period = first.get("traffic_per_period")
-            if used_period is not None:
-                try:
-                    used = float(used_period)
-                except (TypeError, ValueError):
-                    used = None
+    subs_info = _extract_subs_info(subscriptions)
+    used = _as_float(subs_info["used"])
+    limit_final = _as_float(subs_info["limit"])
 
     # Prefer totals in bytes from metadata; fallback to summing rx_tx_bytes
     total_used_gb: Optional[float] = None
@@ -425,83 +572,55 @@ def format_usage(
         totals = traffic.get("metadata", {}).get("totals", {}) if isinstance(traffic, dict) else {}
         total_rx_tx = totals.get("total_rx_tx")
         if isinstance(total_rx_tx, (int, float)):
-            total_used_gb = float(total_rx_tx) / 1_000_000_000.0  # bytes -> GB (decimal)
+            total_used_gb = total_rx_tx / BYTES_PER_GB
     except Exception:
         total_used_gb = None
     if total_used_gb is None:
         try:
             if isinstance(traffic, dict) and isinstance(traffic.get("data"), list):
-                total_bytes = 0
-                for item in traffic["data"]:
-                    if isinstance(item, dict):
-                        total_bytes += int(item.get("rx_tx_bytes", 0))
-                total_used_gb = float(total_bytes) / 1_000_000_000.0
+                total_bytes = sum(
+                    map(int, (item.get("rx_tx_bytes", 0) for item in traffic["data"] if isinstance(item, dict)))
+                )
+                total_used_gb = total_bytes / BYTES_PER_GB
         except Exception:
             total_used_gb = None
 
     # If subscription-provided used is present (likely already in GB), prefer it; else use computed GB
     used_final = used if used is not None else total_used_gb
-    if used_final is None and limit is None:
+    if used_final is None and limit_final is None:
         return "Couldn't determine usage from API response."
 
-    subs_info = _extract_subs_info(subscriptions)
-
-    limit_final: Optional[float] = None
-    if limit is not None:
-        try:
-            limit_final = float(limit)
-        except (TypeError, ValueError):
-            limit_final = None
-    if limit_final is None and subs_info.get("limit") is not None:
-        try:
-            limit_final = float(subs_info["limit"])  # type: ignore[arg-type]
-        except (TypeError, ValueError):
-            limit_final = None
-
-    def _date_only_text(val: Optional[str]) -> Optional[str]:
-        if not val:
-            return None
-        s = str(val).strip()
-        # quick ISO-like cleanup
-        s = s.replace("T", " ").replace("Z", "").split(".")[0]
-        # prefer first 10 chars if they look like YYYY-MM-DD
-        if len(s) >= 10 and s[4] == "-" and s[7] == "-" and s[:10].replace("-", "").isdigit():
-            return s[:10]
-        # fallback: return original string
-        return s
-
-    lines: list[str] = []
-    title = "Decodo Usage"
-    if proxy_type:
-        title += f" — {proxy_type}"
-    lines.append(title)
-
+    period_line: Optional[str] = None
     if timeframe_label:
         # Allow caller to pass in already formatted date-only label
-        lines.append(f"Period: {timeframe_label}")
+        period_line = f"Period: {timeframe_label}"
     elif subs_info.get("period_start") or subs_info.get("period_end"):
         ps = _date_only_text(subs_info.get("period_start")) or "?"
         pe = _date_only_text(subs_info.get("period_end")) or "?"
-        lines.append(f"Subscription period: {ps} → {pe}")
-
-    if subs_info.get("plan"):
-        lines.append(f"Plan: {subs_info['plan']}")
+        period_line = f"Subscription period: {ps} → {pe}"
 
+    usage_lines: Tuple[str, ...] = ()
     if used_final is not None and limit_final is not None:
-        remaining = max(limit_final - used_final, 0.0)
-        lines.append(f"Usage: {used_final:.2f} GB of {limit_final:.2f} GB")
-        lines.append(f"Remaining: {remaining:.2f} GB")
+        usage_lines = (
+            f"Usage: {used_final:.2f} GB of {limit_final:.2f} GB",
+            f"Remaining: {max(limit_final - used_final, 0.0):.2f} GB",
+        )
     elif used_final is not None:
-        lines.append(f"Used: {used_final:.2f} GB")
+        usage_lines = (f"Used: {used_final:.2f} GB",)
     elif limit_final is not None:
-        lines.append(f"Limit: {limit_final:.2f} GB")
+        usage_lines = (f"Limit: {limit_final:.2f} GB",)
 
     now = dt.datetime.now(tz or dt.UTC).replace(microsecond=0)
     tz_name = now.tzname() or "UTC"
-    lines.append("")
-    lines.append(f"As of: {now.strftime('%Y-%m-%d %H:%M:%S')} {tz_name}")
-
-    return "\n".join(lines)
+    parts = (
+        f"Decodo Usage — {proxy_type}" if proxy_type else "Decodo Usage",
+        period_line,
+        f"Plan: {subs_info['plan']}" if subs_info.get("plan") else None,
+        *usage_lines,
+        "",
+        f"As of: {now.strftime('%Y-%m-%d %H:%M:%S')} {tz_name}",
+    )
+    return "\n".join(p for p in parts if p is not None)
 
 
 # -----------------------------
@@ -522,8 +641,38 @@ def _is_allowed(chat_id: int, allowed: Optional[Set[int]]) -> bool:
     return allowed is None or chat_id in allowed
 
 
-def _build_proxy_type_candidates(env_value: Optional[str]) -> list[Optional[str]]:
-    """Return an ordered list of proxyType candidates to try.
+# (DECODO_SERVICE_TYPE, groupBy) -> proxyType that last returned traffic (None is the API
+# default). Kept per groupBy so the hourly chart fallback can't change what /usage asks for.
+_preferred_proxy_types: Dict[Tuple[Optional[str], str], Optional[str]] = {}
+
+# (proxyType, groupBy) -> time.monotonic() of a 400 it got while another candidate
+# succeeded for the same query; such candidates are skipped for a while. Per groupBy,
+# since an hourly query can be rejected where the daily one works.
+_PROXY_TYPE_400: Dict[Tuple[Optional[str], str], float] = {}
+PROXY_TYPE_400_TTL = 3600.0
+
+
+def _remember_proxy_type(env_value: Optional[str], proxy_type: Optional[str], group_by: str) -> None:
+    _preferred_proxy_types[(env_value, group_by)] = proxy_type
+
+
+def _reject_proxy_type(proxy_type: Optional[str], group_by: str) -> None:
+    """Record a 400 for proxy_type so it is skipped for a while.
+
+    Only called once another candidate has won the same query; that winner then
+    replaces the remembered proxyType, so the memo needs no separate cleanup.
+    """
+    _PROXY_TYPE_400[(proxy_type, group_by)] = time.monotonic()
+
+
+def debug_reset_blacklist() -> None:
+    """Forget all proxyType 400s so every candidate is probed again."""
+    _PROXY_TYPE_400.clear()
+
+
+@functools.lru_cache(maxsize=32)
+def _build_proxy_type_candidates(env_value: Optional[str]) -> Tuple[Optional[str], ...]:
+    """Return an ordered tuple of proxyType candidates to try.
 
     Priority:
     - mapped env value (if provided)
@@ -550,157 +699,178 @@ def _build_proxy_type_candidates(env_value: Optional[str]) -> list[Optional[str]
     ):
         if v != first:
             candidates.append(v)
-    return candidates
+    return tuple(candidates)
+
 
+def _proxy_type_probe_order(settings: Settings, group_by: str = "day") -> list[list[Optional[str]]]:
+    """Split the candidates into probe rounds.
+
+    Candidates that returned 400 within PROXY_TYPE_400_TTL are left out. When the
+    remembered proxyType is the highest-priority candidate left, it forms a round
+    of its own, so the usual case is a single request; the remaining candidates
+    follow only if it fails. Once a candidate ahead of it is eligible again (its
+    400 expired), everything is probed in priority order so it can win back.
+    """
+    now = time.monotonic()
+    candidates = [
+        pt
+        for pt in settings.proxy_type_candidates
+        if (pt, group_by) not in _PROXY_TYPE_400 or now - _PROXY_TYPE_400[(pt, group_by)] >= PROXY_TYPE_400_TTL
+    ]
+    if not candidates:
+        # Everything failed recently (e.g. a bad date window rather than proxyType): retry all
+        candidates = settings.proxy_type_candidates
+    memo_key = (settings.decodo_service_type, group_by)
+    if memo_key in _preferred_proxy_types:
+        preferred = _preferred_proxy_types[memo_key]
+        if candidates[0] == preferred:
+            return [[preferred], list(candidates[1:])]
+    return [list(candidates)]
+
+
+# Upper bound on simultaneous proxyType probes, to stay clear of Decodo rate limits
+PROXY_TYPE_PROBE_CONCURRENCY = 4
+
+
+def _discard_tasks(tasks: list[asyncio.Task[Any]]) -> None:
+    for task in tasks:
+        if task.done():
+            if not task.cancelled():
+                # Mark the result as retrieved so asyncio doesn't warn about it
+                task.exception()
+        else:
+            task.cancel()
+
+
+async def _probe_proxy_types(
+    settings: Settings,
+    fetch: Callable[[Optional[str]], Awaitable[Dict[str, Any]]],
+    *,
+    group_by: str = "day",
+) -> Dict[str, Any]:
+    """Run ``fetch`` for proxyType candidates concurrently and return the first success.
+
+    Candidates are awaited in priority order, so a lower-priority proxyType only
+    wins once every candidate ahead of it has failed; requests still in flight are
+    cancelled as soon as the winner is known. A remembered proxyType is tried on
+    its own first, so the usual case costs a single request.
+    """
+    service_type = settings.decodo_service_type
+    semaphore = asyncio.Semaphore(PROXY_TYPE_PROBE_CONCURRENCY)
+
+    async def probe(pt: Optional[str]) -> Dict[str, Any]:
+        async with semaphore:
+            return await fetch(pt)
 
-async def _fetch_month_usage_with_fallback(client: DecodoClient, *, proxy_types: list[Optional[str]]) -> Dict[str, Any]:
-    """Try month-to-date traffic with several proxyType values until one succeeds."""
     last_err: Optional[Exception] = None
-    for pt in proxy_types:
+    # A 400 only shows the proxyType is wrong if another candidate then succeeds;
+    # when all of them fail it's the request itself, so nothing is blacklisted
+    got_400: list[Optional[str]] = []
+    for group in _proxy_type_probe_order(settings, group_by):
+        tasks = [asyncio.create_task(probe(pt)) for pt in group]
         try:
-            return await client.get_current_month_usage(type_=pt)
-        except httpx.HTTPStatusError as e:
-            # For 400 (bad proxyType or bad request), continue trying
-            if e.response is not None and e.response.status_code == 400:
-                logger.warning("Decodo traffic 400 with proxyType=%s; trying next candidate. body=%s", pt, e.response.text)
-                last_err = e
-                continue
-            # Other status codes: propagate immediately
-            raise
-        except Exception as e:
-            last_err = e
-            logger.warning("Decodo traffic error with proxyType=%s: %s", pt, e)
-            continue
+            for pt, task in zip(group, tasks):
+                try:
+                    traffic = await task
+                except httpx.HTTPStatusError as e:
+                    # For 400 (bad proxyType or bad request), continue trying
+                    if e.response is not None and e.response.status_code == 400:
+                        got_400.append(pt)
+                        logger.warning("Decodo traffic 400 with proxyType=%s; trying next candidate", pt)
+                        last_err = e
+                        continue
+                    # Other status codes: propagate immediately
+                    raise
+                except Exception as e:
+                    last_err = e
+                    logger.warning("Decodo traffic error with proxyType=%s: %s", pt, e)
+                    continue
+                for rejected in got_400:
+                    _reject_proxy_type(rejected, group_by)
+                _remember_proxy_type(service_type, pt, group_by)
+                return traffic
+        finally:
+            _discard_tasks(tasks)
     assert last_err is not None
     raise last_err
 
 
+async def _try_get_traffic(
+    client: DecodoClient,
+    settings: Settings,
+    *,
+    from_date: Optional[str],
+    to_date: Optional[str],
+    group_by: str = "day",
+) -> Dict[str, Any]:
+    """Fetch traffic for the window, falling back across proxyType candidates."""
+    return await _probe_proxy_types(
+        settings,
+        lambda pt: client.get_traffic(from_date=from_date, to_date=to_date, type_=pt, group_by=group_by),
+        group_by=group_by,
+    )
+
+
 @router.message(CommandStart())
 async def cmd_start(message: Message) -> None:
     await message.answer("Hi. Use the button below or send /usage to get Decodo usage.", reply_markup=MAIN_KB)
 
 
-async def _handle_usage(message: Message, bot: Bot) -> None:
+async def _handle_usage(message: Message, bot: Bot, settings: Settings, decodo: DecodoClient) -> None:
     chat_id = message.chat.id
 
-    # Settings are read on each command to reflect any env changes without restart
-    settings = Settings()
     if not _is_allowed(chat_id, settings.telegram_allowed_chat_ids):
         await message.answer("Not authorized.")
         return
 
     async with ChatActionSender.typing(chat_id=chat_id, bot=bot):
         try:
-            client = DecodoClient(settings.decodo_api_key)
-            try:
-                # Build optional timeframe from env provided subscription dates
-                env_from = settings.subscription_start_date
-                env_to = settings.subscription_end_date
-
-                def to_ts(date_str: str, end_of_day: bool = False) -> str:
-                    # Accept YYYY-MM-DD and expand to full timestamp in UTC (no TZ suffix per API examples)
-                    date_str = date_str.strip()
-                    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-                        return f"{date_str} {'23:59:59' if end_of_day else '00:00:00'}"
-                    # If already a timestamp-like string, pass through
-                    return date_str
-
-                traffic: Dict[str, Any]
-                if env_from:
-                    # Rolling monthly window anchored to provided start date; end at cycle end (cap to now)
-                    now = dt.datetime.now(dt.UTC).replace(microsecond=0)
-                    start_d = _anchored_period_start(env_from, now)
-                    end_d = _anchored_period_end(env_from, start_d) if start_d else None
-                    from_date = f"{start_d.strftime('%Y-%m-%d')} 00:00:00" if start_d else to_ts(env_from)
-                    if end_d:
-                        end_dt = dt.datetime(end_d.year, end_d.month, end_d.day, 23, 59, 59, tzinfo=dt.UTC)
-                        to_dt = min(now, end_dt)
-                    else:
-                        to_dt = now
-                    to_date = to_dt.strftime("%Y-%m-%d %H:%M:%S")
-                    # Query with proxyType fallbacks
-                    last_err: Optional[Exception] = None
-                    for pt in _build_proxy_type_candidates(settings.decodo_service_type):
-                        try:
-                            traffic = await client.get_traffic(
-                                from_date=from_date,
-                                to_date=to_date,
-                                type_=pt,
-                                group_by="day",
-                            )
-                            break
-                        except httpx.HTTPStatusError as e:
-                            if e.response is not None and e.response.status_code == 400:
-                                logger.warning("Decodo traffic 400 with proxyType=%s; trying next candidate. body=%s", pt, e.response.text)
-                                last_err = e
-                                continue
-                            raise
-                        except Exception as e:
-                            last_err = e
-                            logger.warning("Decodo traffic error with proxyType=%s: %s", pt, e)
-                            continue
-                    else:
-                        assert last_err is not None
-                        raise last_err
-                elif env_to:
-                    # Fixed window ending at provided end date (legacy behavior)
-                    from_date = None
-                    to_date = to_ts(env_to, end_of_day=True)
-                    last_err: Optional[Exception] = None
-                    for pt in _build_proxy_type_candidates(settings.decodo_service_type):
-                        try:
-                            traffic = await client.get_traffic(
-                                from_date=from_date,
-                                to_date=to_date,
-                                type_=pt,
-                                group_by="day",
-                            )
-                            break
-                        except httpx.HTTPStatusError as e:
-                            if e.response is not None and e.response.status_code == 400:
-                                logger.warning("Decodo traffic 400 with proxyType=%s; trying next candidate. body=%s", pt, e.response.text)
-                                last_err = e
-                                continue
-                            raise
-                        except Exception as e:
-                            last_err = e
-                            logger.warning("Decodo traffic error with proxyType=%s: %s", pt, e)
-                            continue
-                    else:
-                        assert last_err is not None
-                        raise last_err
+            # Build optional timeframe from env provided subscription dates
+            env_from = settings.subscription_start_date
+            env_to = settings.subscription_end_date
+
+            from_date: Optional[str]
+            start_d: Optional[dt.date] = None
+            end_d: Optional[dt.date] = None
+            if env_from:
+                # Rolling monthly window anchored to provided start date; end at cycle end (cap to now)
+                now = _utc_now()
+                anchor = settings.subscription_start_date_parsed
+                start_d = _anchored_period_start(anchor, now.date())
+                end_d = _anchored_period_end(anchor, start_d) if start_d else None
+                from_date = f"{start_d.isoformat()} 00:00:00" if start_d else _to_api_ts(env_from)
+                if end_d:
+                    end_dt = dt.datetime(end_d.year, end_d.month, end_d.day, 23, 59, 59, tzinfo=dt.UTC)
+                    to_dt = min(now, end_dt)
                 else:
-                    # Default: current month usage with proxyType fallbacks
-                    traffic = await _fetch_month_usage_with_fallback(
-                        client,
-                        proxy_types=_build_proxy_type_candidates(settings.decodo_service_type),
-                    )
-            finally:
-                await client.aclose()
+                    to_dt = now
+                to_date = _format_api_ts(to_dt)
+            elif env_to:
+                # Fixed window ending at provided end date (legacy behavior)
+                from_date = None
+                to_date = _to_api_ts(env_to, end_of_day=True)
+            else:
+                # Default: current month usage
+                from_date, to_date = _current_month_window()
+            traffic = await _try_get_traffic(decodo, settings, from_date=from_date, to_date=to_date)
 
             # Build subscription info from env, and a label
             subs_env: Dict[str, Any] | None = None
             label: Optional[str] = None
-            if settings.subscription_start_date:
-                # Show anchored cycle start → cycle end (labels)
-                now_utc = dt.datetime.now(dt.UTC)
-                start_d = _anchored_period_start(settings.subscription_start_date, now_utc)
-                end_d = _anchored_period_end(settings.subscription_start_date, start_d) if start_d else None
-                start_label = start_d.strftime('%Y-%m-%d') if start_d else settings.subscription_start_date
-                end_label = end_d.strftime('%Y-%m-%d') if end_d else dt.datetime.now(settings.timezone).date().strftime('%Y-%m-%d')
+            if env_from:
+                # Show anchored cycle start → cycle end (labels), reusing the query's cycle
+                start_label = start_d.isoformat() if start_d else env_from
+                end_label = end_d.isoformat() if end_d else dt.datetime.now(settings.timezone).date().isoformat()
                 label = f"{start_label} → {end_label}"
                 subs_env = {
                     "traffic_limit": settings.subscription_limit_gb,
                     "current_period_start": start_label,
                     "current_period_end": end_label,
                 }
-            elif settings.subscription_end_date:
+            elif env_to:
                 ps = "?"
-                pe = settings.subscription_end_date.strip()
-                def d_only(s: str) -> str:
-                    s = s.replace('T', ' ').replace('Z', '').split('.')[0]
-                    return s[:10] if len(s) >= 10 and s[4] == '-' and s[7] == '-' else s
-                label = f"{d_only(ps)} → {d_only(pe)}"
+                pe = env_to.strip()
+                label = f"{_date_only_text(ps)} → {_date_only_text(pe)}"
                 subs_env = {
                     "traffic_limit": settings.subscription_limit_gb,
                     "current_period_start": None,
@@ -708,20 +878,19 @@ async def _handle_usage(message: Message, bot: Bot) -> None:
                 }
             else:
                 # Default label: current month in user's timezone (date-only)
-                now_local = dt.datetime.now(settings.timezone).replace(microsecond=0)
-                start_dt_local = now_local.replace(day=1, hour=0, minute=0, second=0)
-                label = f"{start_dt_local.strftime('%Y-%m-%d')} → {now_local.strftime('%Y-%m-%d')}"
+                month_start, today = _local_month_dates(settings.timezone, int(time.time()) // 60)
+                label = f"{month_start} → {today}"
                 subs_env = {
                     "traffic_limit": settings.subscription_limit_gb,
-                    "current_period_start": start_dt_local.strftime('%Y-%m-%d'),
-                    "current_period_end": now_local.strftime('%Y-%m-%d'),
+                    "current_period_start": month_start,
+                    "current_period_end": today,
                 }
 
             text = format_usage(
                 subs_env,
                 traffic,
                 timeframe_label=label,
-                proxy_type=_map_service_to_proxy_type(settings.decodo_service_type),
+                proxy_type=settings.mapped_proxy_type,
                 tz=settings.timezone,
             )
             await message.answer(text, reply_markup=MAIN_KB)
@@ -733,37 +902,54 @@ async def _handle_usage(message: Message, bot: Bot) -> None:
             await message.answer(f"Error fetching usage: {e}")
 
 
+@functools.lru_cache(maxsize=4096)
 def _parse_date_guess(s: str) -> Optional[dt.date]:
     s = s.strip()
-    if not s:
+    if (
+        len(s) >= 10
+        and s[4] == "-"
+        and s[7] == "-"
+        and s[0:4].isdigit()
+        and s[5:7].isdigit()
+        and s[8:10].isdigit()
+    ):
+        # Common case: YYYY-MM-DD, optionally followed by a time part
+        try:
+            return dt.date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+        except ValueError:
+            pass
+    if len(s) < 5 or s[4] != "-":
+        # Epoch numbers and basic/week ISO forms ("20240105", "2024W01") are not dates here
         return None
+    # Rare extended shapes such as unpadded "2024-1-5": same strptime rules as before
     try:
-        # Try full timestamp first
         s2 = s.replace("T", " ").replace("Z", "").split(".")[0]
         return dt.datetime.strptime(s2, "%Y-%m-%d %H:%M:%S").date()
-    except Exception:
+    except ValueError:
         pass
     try:
         return dt.datetime.strptime(s[:10], "%Y-%m-%d").date()
-    except Exception:
+    except ValueError:
         return None
 
 
+@functools.lru_cache(maxsize=256)
 def _last_day_of_month(year: int, month: int) -> int:
     return calendar.monthrange(year, month)[1]
 
 
-def _anchored_period_start(anchor_date_str: str, now_utc: dt.datetime) -> Optional[dt.date]:
+@functools.lru_cache(maxsize=64)
+def _anchored_period_start(anchor: Optional[dt.date], today: dt.date) -> Optional[dt.date]:
     """Compute current cycle start date from an anchor start date.
 
     The anchor day-of-month defines the billing boundary. For months shorter than
-    the anchor day (e.g., 31st), clamp to the last day of that month.
+    the anchor day (e.g., 31st), clamp to the last day of that month. ``today`` is
+    the current UTC date; results are cached per (anchor, day). Pass the parsed
+    anchor (Settings.subscription_start_date_parsed); None yields None.
     """
-    anchor = _parse_date_guess(anchor_date_str)
     if not anchor:
         return None
     anchor_day = anchor.day
-    today = now_utc.date()
 
     # Candidate in current month
     ld = _last_day_of_month(today.year, today.month)
@@ -781,12 +967,12 @@ def _anchored_period_start(anchor_date_str: str, now_utc: dt.datetime) -> Option
     return dt.date(py, pm, pday)
 
 
-def _anchored_period_end(anchor_date_str: str, start: dt.date) -> Optional[dt.date]:
+@functools.lru_cache(maxsize=64)
+def _anchored_period_end(anchor: Optional[dt.date], start: dt.date) -> Optional[dt.date]:
     """Compute the cycle end date (next boundary) based on anchor day-of-month.
 
     End is the next month boundary using the anchor day-of-month, clamped to month length.
     """
-    anchor = _parse_date_guess(anchor_date_str)
     if not anchor:
         return None
     anchor_day = anchor.day
@@ -799,269 +985,343 @@ def _anchored_period_end(anchor_date_str: str, start: dt.date) -> Optional[dt.da
     return dt.date(year, month, min(anchor_day, ld))
 
 
-def _build_date_span(start: dt.date, end: dt.date) -> list[dt.date]:
+def _build_date_span(start: dt.date, end: dt.date) -> list[str]:
+    """Return the YYYY-MM-DD key of each date from start to end inclusive."""
     if end < start:
         start, end = end, start
-    days = (end - start).days
-    return [start + dt.timedelta(days=i) for i in range(days + 1)]
+    return [dt.date.fromordinal(o).isoformat() for o in range(start.toordinal(), end.toordinal() + 1)]
+
+
+# Field name variants (snake/camel) seen across products in traffic rows
+_TRAFFIC_CONTAINER_KEYS: Final[Tuple[str, ...]] = ("data", "result", "records", "rows", "items")
+_DIRECT_BYTES_KEYS: Final[Tuple[str, ...]] = ("rx_tx_bytes", "rxTxBytes", "rx_tx", "rxTx", "traffic_bytes", "trafficBytes", "bytes")
+_GB_KEYS: Final[Tuple[str, ...]] = ("traffic_gb", "trafficGB", "usage_gb", "usageGB")
+_MB_KEYS: Final[Tuple[str, ...]] = ("traffic_mb", "trafficMB", "usage_mb", "usageMB")
+_GENERIC_TRAFFIC_KEYS: Final[Tuple[str, ...]] = ("traffic", "usage")
+_TOTALS_BYTES_KEYS: Final[Tuple[str, ...]] = ("rx_tx_bytes", "rxTxBytes", "rx_tx", "rxTx", "bytes", "total_rx_tx")
+_NESTED_METRIC_KEYS: Final[Tuple[str, ...]] = ("value", "metrics", "stat", "stats")
+_DATE_KEYS: Final[Tuple[str, ...]] = ("date", "day", "timestamp", "time", "bucket", "startDate", "grouping_key", "groupingValue", "group", "key")
+_GROUPING_KEYS: Final[Tuple[str, ...]] = ("grouping", "groupKey", "grouping_key")
+_GROUPING_DATE_KEYS: Final[Tuple[str, ...]] = ("date", "day", "timestamp", "time", "bucket", "startDate", "value")
+# Unit suffix -> bytes multiplier for values like '123.4GB' or '567MB'
+_UNIT_MULT: Final[Dict[str, int]] = {"gb": 1_000_000_000, "mb": 1_000_000, "kb": 1_000, "b": 1}
+
+
+def _parse_unit_value(v: Any) -> Optional[int]:
+    # Parse values that may include units like '123.4GB' or '567MB'
+    if isinstance(v, (int, float)):
+        return int(v)
+    if isinstance(v, str):
+        s = v.strip().lower()
+        mult = _UNIT_MULT.get(s[-2:])
+        if mult is not None:
+            s = s[:-2]
+        else:
+            mult = _UNIT_MULT.get(s[-1:])
+            if mult is not None:
+                s = s[:-1]
+        try:
+            # plain number string -> bytes
+            return int(float(s.strip()) * (mult or 1))
+        except Exception:
+            return None
+    return None
 
 
-def _daily_bytes_from_traffic(traffic: Dict[str, Any]) -> Dict[str, int]:
-    """Extract mapping YYYY-MM-DD -> bytes for each day from API response.
+def _sum_rx_tx(node: Dict[str, Any]) -> Optional[int]:
+    rx = node.get("rx_bytes") or node.get("rxBytes")
+    tx = node.get("tx_bytes") or node.get("txBytes")
+    try:
+        if isinstance(rx, (int, float)) or isinstance(tx, (int, float)):
+            return int(rx or 0) + int(tx or 0)
+    except Exception:
+        pass
+    return None
 
-    Handles multiple container and field name variants seen across products.
+
+def _extract_bytes(it: Dict[str, Any]) -> int:
+    # Direct fields (numbers or strings with units)
+    for k in _DIRECT_BYTES_KEYS:
+        pv = _parse_unit_value(it.get(k))
+        if pv is not None:
+            return pv
+    # Sum rx/tx
+    rx_tx = _sum_rx_tx(it)
+    if rx_tx is not None:
+        return rx_tx
+    # Traffic/usage fields with explicit units
+    for k in _GB_KEYS:
+        v = it.get(k)
+        if isinstance(v, (int, float)):
+            return int(float(v) * 1_000_000_000)
+    for k in _MB_KEYS:
+        v = it.get(k)
+        if isinstance(v, (int, float)):
+            return int(float(v) * 1_000_000)
+    # Generic 'traffic' or 'usage'
+    for k in _GENERIC_TRAFFIC_KEYS:
+        pv = _parse_unit_value(it.get(k))
+        if pv is not None:
+            return pv
+    # Totals container
+    totals = it.get("totals")
+    if isinstance(totals, dict):
+        for k in _TOTALS_BYTES_KEYS:
+            v = totals.get(k)
+            if isinstance(v, (int, float)):
+                return int(v)
+        rx_tx = _sum_rx_tx(totals)
+        if rx_tx is not None:
+            return rx_tx
+    # Check common nested maps
+    for nest_key in _NESTED_METRIC_KEYS:
+        m = it.get(nest_key)
+        if isinstance(m, dict):
+            # Recurse lightly: try the same keys in the nested map
+            vv = _extract_bytes(m)
+            if vv:
+                return vv
+    return 0
+
+
+def _specialized_bytes_extractor(sample: Dict[str, Any]) -> Callable[[Dict[str, Any]], int]:
+    """Build a bytes extractor for rows laid out like ``sample``.
+
+    Rows in one response share a schema, so when the sample carries a direct
+    numeric bytes field the extractor reads just that field. Rows that don't
+    fit (non-numeric value, or a higher-priority field present) fall back to
+    _extract_bytes, so results match it exactly.
     """
-    result: Dict[str, int] = {}
-    if not isinstance(traffic, dict):
-        return result
+    for i, key in enumerate(_DIRECT_BYTES_KEYS):
+        if _parse_unit_value(sample.get(key)) is not None:
+            break
+    else:
+        return _extract_bytes
+    shadowing = _DIRECT_BYTES_KEYS[:i]
+
+    def extract(it: Dict[str, Any]) -> int:
+        v = it.get(key)
+        if isinstance(v, (int, float)) and not any(k in it for k in shadowing):
+            return int(v)
+        return _extract_bytes(it)
+
+    return extract
+
+
+def _extract_date_str(it: Dict[str, Any]) -> Optional[str]:
+    # direct keys
+    for k in _DATE_KEYS:
+        v = it.get(k)
+        if v:
+            return str(v)
+    # nested under grouping_key object
+    for k in _GROUPING_KEYS:
+        v = it.get(k)
+        if isinstance(v, dict):
+            for dk in _GROUPING_DATE_KEYS:
+                dv = v.get(dk)
+                if dv:
+                    return str(dv)
+    return None
 
-    # Try common containers
-    containers: list[Any] = []
-    for key in ("data", "result", "records", "rows", "items"):
+
+def _traffic_containers(traffic: Dict[str, Any]) -> list[list[Any]]:
+    """Return the row lists found under the known container keys."""
+    containers: list[list[Any]] = []
+    if not isinstance(traffic, dict):
+        return containers
+    for key in _TRAFFIC_CONTAINER_KEYS:
         val = traffic.get(key)
         if isinstance(val, list):
             containers.append(val)
         elif isinstance(val, dict) and isinstance(val.get("items"), list):
-            containers.append(val.get("items"))
-    if not containers:
-        return result
+            containers.append(val["items"])
+    return containers
 
-    def extract_bytes(it: Dict[str, Any]) -> int:
-        def parse_unit_value(v: Any) -> Optional[int]:
-            # Parse values that may include units like '123.4GB' or '567MB'
-            if isinstance(v, (int, float)):
-                return int(v)
-            if isinstance(v, str):
-                s = v.strip().lower()
-                try:
-                    if s.endswith("gb"):
-                        return int(float(s[:-2].strip()) * 1_000_000_000)
-                    if s.endswith("mb"):
-                        return int(float(s[:-2].strip()) * 1_000_000)
-                    if s.endswith("kb"):
-                        return int(float(s[:-2].strip()) * 1_000)
-                    if s.endswith("b"):
-                        return int(float(s[:-1].strip()))
-                    # plain number string -> bytes
-                    return int(float(s))
-                except Exception:
-                    return None
-            return None
 
-        # Direct fields (snake/camel)
-        for k in (
-            "rx_tx_bytes",
-            "rxTxBytes",
-            "rx_tx",
-            "rxTx",
-            "traffic_bytes",
-            "trafficBytes",
-            "bytes",
-        ):
-            v = it.get(k)
-            if isinstance(v, (int, float)):
-                return int(v)
-            pv = parse_unit_value(v)
-            if pv is not None:
-                return pv
-        # Sum rx/tx (snake/camel)
-        rx = it.get("rx_bytes") or it.get("rxBytes")
-        tx = it.get("tx_bytes") or it.get("txBytes")
-        try:
-            if isinstance(rx, (int, float)) or isinstance(tx, (int, float)):
-                return int(rx or 0) + int(tx or 0)
-        except Exception:
-            pass
-        # Traffic/usage fields with explicit units
-        for k in ("traffic_gb", "trafficGB", "usage_gb", "usageGB"):
-            v = it.get(k)
-            if isinstance(v, (int, float)):
-                return int(float(v) * 1_000_000_000)
-        for k in ("traffic_mb", "trafficMB", "usage_mb", "usageMB"):
-            v = it.get(k)
-            if isinstance(v, (int, float)):
-                return int(float(v) * 1_000_000)
-        # Generic 'traffic' or 'usage'
-        for k in ("traffic", "usage"):
-            pv = parse_unit_value(it.get(k))
-            if pv is not None:
-                return pv
-        # Totals container
-        totals = it.get("totals")
-        if isinstance(totals, dict):
-            for k in ("rx_tx_bytes", "rxTxBytes", "rx_tx", "rxTx", "bytes", "total_rx_tx"):
-                v = totals.get(k)
-                if isinstance(v, (int, float)):
-                    return int(v)
-            rx2 = totals.get("rx_bytes") or totals.get("rxBytes")
-            tx2 = totals.get("tx_bytes") or totals.get("txBytes")
-            try:
-                if isinstance(rx2, (int, float)) or isinstance(tx2, (int, float)):
-                    return int(rx2 or 0) + int(tx2 or 0)
-            except Exception:
-                pass
-        # Check common nested maps
-        for nest_key in ("value", "metrics", "stat", "stats"):
-            m = it.get(nest_key)
-            if isinstance(m, dict):
-                # Recurse lightly: try the same keys in the nested map
-                vv = extract_bytes(m)
-                if vv:
-                    return vv
-        return 0
-
-    def extract_date_str(it: Dict[str, Any]) -> Optional[str]:
-        # direct keys
-        for k in (
-            "date",
-            "day",
-            "timestamp",
-            "time",
-            "bucket",
-            "startDate",
-            "grouping_key",
-            "groupingValue",
-            "group",
-            "key",
-        ):
-            v = it.get(k)
-            if v:
-                return str(v)
-        # nested under grouping_key object
-        for k in ("grouping", "groupKey", "grouping_key"):
-            v = it.get(k)
-            if isinstance(v, dict):
-                for dk in ("date", "day", "timestamp", "time", "bucket", "startDate", "value"):
-                    dv = v.get(dk)
-                    if dv:
-                        return str(dv)
-        return None
+def _traffic_has_no_rows(traffic: Dict[str, Any]) -> bool:
+    """True when the response has a recognized container and every one is empty."""
+    containers = _traffic_containers(traffic)
+    return bool(containers) and not any(containers)
+
+
+def _daily_bytes_from_traffic(traffic: Dict[str, Any]) -> Dict[str, int]:
+    """Extract mapping YYYY-MM-DD -> bytes for each day from API response.
 
-    for data in containers:
+    Handles multiple container and field name variants seen across products.
+    """
+    # Sum per date first and format each distinct day once (hourly data has 24 rows a day)
+    per_day: Dict[dt.date, int] = collections.defaultdict(int)
+    # Specialized on the first dated row, then reused for the rest of the response
+    extract: Optional[Callable[[Dict[str, Any]], int]] = None
+    for data in _traffic_containers(traffic):
         for item in data:
             if not isinstance(item, dict):
                 continue
-            date_str = extract_date_str(item)
+            date_str = _extract_date_str(item)
             if not date_str:
                 continue
             d = _parse_date_guess(date_str)
             if not d:
                 continue
-            b = extract_bytes(item)
-            key = d.strftime("%Y-%m-%d")
-            result[key] = result.get(key, 0) + b
-    return result
+            if extract is None:
+                extract = _specialized_bytes_extractor(item)
+            per_day[d] += extract(item)
+    return {d.isoformat(): total for d, total in per_day.items()}
 
 
-def _render_daily_chart(dates: list[dt.date], values_gb: list[float], *, title: str) -> bytes:
-    # Lazy import matplotlib to avoid overhead when not used
-    import matplotlib
-    # Ensure a non-interactive backend
+# Chart styling (pixels unless noted)
+CHART_HEIGHT: Final = 480
+CHART_BAR_FILL: Final = "#3b82f6"
+CHART_BAR_OUTLINE: Final = "#1e40af"
+CHART_GRID: Final = "#d1d5db"
+CHART_Y_TICKS: Final = 5
+# Pillow's bundled font has no glyphs for these; swap in ASCII lookalikes
+_CHART_TEXT_FALLBACKS: Final = str.maketrans({"—": "-", "→": "->"})
+
+
+@functools.lru_cache(maxsize=8)
+def _chart_font(size: int) -> ImageFont.ImageFont | ImageFont.FreeTypeFont:
+    # Pillow's bundled font; load_default(size=...) needs FreeType
     try:
-        matplotlib.use("Agg", force=False)
-    except Exception:
-        pass
-    import matplotlib.pyplot as plt
-
-    fig, ax = plt.subplots(figsize=(max(6, min(14, len(dates) * 0.4)), 4))
-    x = [d.strftime("%Y-%m-%d") for d in dates]
-    ax.bar(x, values_gb, color="#3b82f6", edgecolor="#1e40af")
-    ax.set_title(title)
-    ax.set_ylabel("GB per day")
-    ax.set_xlabel("Date")
-    ax.grid(axis="y", linestyle=":", alpha=0.6)
-    # Show at most ~12 x-ticks to keep readable
-    step = max(1, len(x) // 12)
-    ax.set_xticks(range(0, len(x), step))
-    ax.set_xticklabels([x[i] for i in range(0, len(x), step)], rotation=45, ha="right", fontsize=9)
-    fig.tight_layout()
+        return ImageFont.load_default(size=size)
+    except (ImportError, OSError):
+        # Pillow built without FreeType: fall back to the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _text_size(draw: ImageDraw.ImageDraw, text: str, font: Any) -> Tuple[int, int]:
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    return right - left, bottom - top
+
+
+def _rotated_text(text: str, font: Any, angle: float) -> Image.Image:
+    """Render text on a transparent canvas rotated counter-clockwise by angle degrees."""
+    probe = ImageDraw.Draw(Image.new("L", (1, 1)))
+    left, top, right, bottom = probe.textbbox((0, 0), text, font=font)
+    canvas = Image.new("LA", (right - left + 2, bottom - top + 2), (0, 0))
+    ImageDraw.Draw(canvas).text((1 - left, 1 - top), text, font=font, fill=(0, 255))
+    return canvas.rotate(angle, expand=True, resample=Image.Resampling.BICUBIC)
+
+
+def _nice_axis_max(value: float) -> float:
+    """Round value up to a readable axis limit (1.0 for empty data)."""
+    if value <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(value))
+    for factor in (1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 10.0):
+        if value <= factor * magnitude:
+            return factor * magnitude
+    return 10.0 * magnitude
+
+
+def _render_daily_chart(day_labels: list[str], values_gb: list[float], *, title: str) -> bytes:
+    n = len(day_labels)
+    width = max(720, min(1680, n * 54))
+    height = CHART_HEIGHT
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    title_font = _chart_font(18)
+    font = _chart_font(13)
+
+    # Plot area; margins leave room for the title, y tick labels and rotated dates
+    left, top, right, bottom = 72, 44, width - 20, height - 110
+    plot_h = bottom - top
+    y_max = _nice_axis_max(max(values_gb, default=0.0))
+
+    # Horizontal grid with y tick labels
+    for i in range(CHART_Y_TICKS + 1):
+        y = bottom - plot_h * i / CHART_Y_TICKS
+        if i:
+            draw.line([(left, y), (right, y)], fill=CHART_GRID, width=1)
+        text = f"{y_max * i / CHART_Y_TICKS:g}"
+        tw, th = _text_size(draw, text, font)
+        draw.text((left - 6 - tw, y - th / 2), text, font=font, fill="black")
+
+    # Bars
+    slot = (right - left) / max(n, 1)
+    bar_w = slot * 0.8
+    for i, v in enumerate(values_gb):
+        if v <= 0:
+            continue
+        x0 = left + slot * i + (slot - bar_w) / 2
+        y0 = bottom - plot_h * min(v / y_max, 1.0)
+        draw.rectangle([x0, y0, x0 + bar_w, bottom], fill=CHART_BAR_FILL, outline=CHART_BAR_OUTLINE)
+
+    draw.line([(left, top), (left, bottom), (right, bottom)], fill="black", width=1)
+
+    # Show at most ~12 x-ticks to keep readable; labels end at their tick like ha="right"
+    step = max(1, n // 12)
+    for i in range(0, n, step):
+        cx = left + slot * (i + 0.5)
+        draw.line([(cx, bottom), (cx, bottom + 4)], fill="black", width=1)
+        label = _rotated_text(day_labels[i], font, 45)
+        img.paste(label.convert("RGBA"), (int(cx - label.width), bottom + 6), label.getchannel("A"))
+
+    title = title.translate(_CHART_TEXT_FALLBACKS)
+    tw, _ = _text_size(draw, title, title_font)
+    draw.text(((width - tw) / 2, 12), title, font=title_font, fill="black")
+    tw, th = _text_size(draw, "Date", font)
+    draw.text(((left + right - tw) / 2, height - th - 10), "Date", font=font, fill="black")
+    y_label = _rotated_text("GB per day", font, 90)
+    img.paste(y_label.convert("RGBA"), (8, int(top + (plot_h - y_label.height) / 2)), y_label.getchannel("A"))
+
     buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=160)
-    plt.close(fig)
-    buf.seek(0)
+    img.save(buf, format="PNG", optimize=True)
+    # getvalue() hands over BytesIO's internal buffer without copying, and
+    # BufferedInputFile streams from it the same way, so bytes costs nothing extra
     return buf.getvalue()
 
 
-async def _handle_chart(message: Message, bot: Bot) -> None:
+def _prewarm_chart() -> None:
+    """Render a throwaway chart so fonts and the PNG encoder are loaded before the first /chart."""
+    _render_daily_chart(["2000-01-01"], [1.0], title="warm-up")
+
+
+async def _handle_chart(message: Message, bot: Bot, settings: Settings, decodo: DecodoClient) -> None:
     chat_id = message.chat.id
-    settings = Settings()
     if not _is_allowed(chat_id, settings.telegram_allowed_chat_ids):
         await message.answer("Not authorized.")
         return
 
     async with ChatActionSender.typing(chat_id=chat_id, bot=bot):
         try:
-            client = DecodoClient(settings.decodo_api_key)
-            try:
-                # Determine date window
-                env_from = settings.subscription_start_date
-                env_to = settings.subscription_end_date
-
-                def to_ts(date_str: str, end_of_day: bool = False) -> str:
-                    date_str = date_str.strip()
-                    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-                        return f"{date_str} {'23:59:59' if end_of_day else '00:00:00'}"
-                    return date_str
-
-                if env_from:
-                    now = dt.datetime.now(dt.UTC).replace(microsecond=0)
-                    start_d = _anchored_period_start(env_from, now)
-                    end_d = _anchored_period_end(env_from, start_d) if start_d else None
-                    from_date = f"{start_d.strftime('%Y-%m-%d')} 00:00:00" if start_d else to_ts(env_from)
-                    if end_d:
-                        end_dt = dt.datetime(end_d.year, end_d.month, end_d.day, 23, 59, 59, tzinfo=dt.UTC)
-                        to_dt = min(now, end_dt)
-                    else:
-                        to_dt = now
-                    to_date = to_dt.strftime("%Y-%m-%d %H:%M:%S")
-                elif env_to:
-                    from_date = None
-                    to_date = to_ts(env_to, end_of_day=True)
-                else:
-                    # current month window
-                    now = dt.datetime.now(dt.UTC).replace(microsecond=0)
-                    start_dt = now.replace(day=1, hour=0, minute=0, second=0)
-                    from_date = start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                    to_date = now.strftime("%Y-%m-%d %H:%M:%S")
-
-                # Fetch traffic with groupBy day and proxyType fallbacks
-                last_err: Optional[Exception] = None
-                traffic: Dict[str, Any]
-                for pt in _build_proxy_type_candidates(settings.decodo_service_type):
-                    try:
-                        traffic = await client.get_traffic(
-                            from_date=from_date,
-                            to_date=to_date,
-                            type_=pt,
-                            group_by="day",
-                        )
-                        break
-                    except httpx.HTTPStatusError as e:
-                        if e.response is not None and e.response.status_code == 400:
-                            logger.warning("Decodo traffic 400 with proxyType=%s; trying next candidate. body=%s", pt, e.response.text)
-                            last_err = e
-                            continue
-                        raise
-                    except Exception as e:
-                        last_err = e
-                        logger.warning("Decodo traffic error with proxyType=%s: %s", pt, e)
-                        continue
+            # Determine date window
+            env_from = settings.subscription_start_date
+            env_to = settings.subscription_end_date
+
+            if env_from:
+                now = _utc_now()
+                anchor = settings.subscription_start_date_parsed
+                start_d = _anchored_period_start(anchor, now.date())
+                end_d = _anchored_period_end(anchor, start_d) if start_d else None
+                from_date = f"{start_d.isoformat()} 00:00:00" if start_d else _to_api_ts(env_from)
+                if end_d:
+                    end_dt = dt.datetime(end_d.year, end_d.month, end_d.day, 23, 59, 59, tzinfo=dt.UTC)
+                    to_dt = min(now, end_dt)
                 else:
-                    assert last_err is not None
-                    raise last_err
-            finally:
-                await client.aclose()
+                    to_dt = now
+                to_date = _format_api_ts(to_dt)
+            elif env_to:
+                from_date = None
+                to_date = _to_api_ts(env_to, end_of_day=True)
+            else:
+                # current month window
+                from_date, to_date = _current_month_window()
+
+            # Fetch traffic with groupBy day; proxyType candidates are probed concurrently
+            traffic = await _try_get_traffic(decodo, settings, from_date=from_date, to_date=to_date, group_by="day")
 
             # Build daily series covering the full window
-            if settings.subscription_start_date:
-                now_utc = dt.datetime.now(dt.UTC)
+            if env_from:
+                # Reuse the cycle computed for the request window. start_d is only None
+                # when the anchor doesn't parse, and then there is no cycle end either.
                 today_local = dt.datetime.now(settings.timezone).date()
-                sd = _anchored_period_start(settings.subscription_start_date, now_utc) or _parse_date_guess(settings.subscription_start_date) or today_local.replace(day=1)
+                sd = start_d or today_local.replace(day=1)
                 # For display, use the cycle end date; data beyond 'now' will be zero
-                ed_cycle = _anchored_period_end(settings.subscription_start_date, sd) if sd else None
-                ed = ed_cycle or today_local
-            elif settings.subscription_end_date:
-                ed = _parse_date_guess(settings.subscription_end_date) or dt.datetime.now(settings.timezone).date()
+                ed = end_d or today_local
+            elif env_to:
+                ed = settings.subscription_end_date_parsed or dt.datetime.now(settings.timezone).date()
                 # If only END provided, chart span covers that calendar month up to END
                 sd = ed.replace(day=1)
             else:
@@ -1069,51 +1329,34 @@ async def _handle_chart(message: Message, bot: Bot) -> None:
                 now_local = dt.datetime.now(settings.timezone).date()
                 sd = now_local.replace(day=1)
                 ed = now_local
-            days = _build_date_span(sd, ed)
+            day_keys = _build_date_span(sd, ed)
             per_day_bytes = _daily_bytes_from_traffic(traffic)
-            # Fallback: if empty, try fetching hourly and aggregate by day
-            if not per_day_bytes:
+            # Fallback: if nothing parsed, try fetching hourly and aggregate by day.
+            # A well-formed response with no rows is a genuinely empty period, so skip it then.
+            if not per_day_bytes and not _traffic_has_no_rows(traffic):
                 try:
-                    last_err2: Optional[Exception] = None
-                    for pt in _build_proxy_type_candidates(settings.decodo_service_type):
-                        try:
-                            traffic_hour = await client.get_traffic(
-                                from_date=from_date,
-                                to_date=to_date,
-                                type_=pt,
-                                group_by="hour",
-                            )
-                            break
-                        except httpx.HTTPStatusError as e:
-                            if e.response is not None and e.response.status_code == 400:
-                                last_err2 = e
-                                continue
-                            raise
-                        except Exception as e:
-                            last_err2 = e
-                            continue
-                    else:
-                        traffic_hour = None  # type: ignore[assignment]
-                    if traffic_hour:
-                        # Reuse parser; hours will map to their date part
-                        per_day_bytes = _daily_bytes_from_traffic(traffic_hour)
+                    traffic_hour = await _try_get_traffic(
+                        decodo, settings, from_date=from_date, to_date=to_date, group_by="hour"
+                    )
+                    # Reuse parser; hours will map to their date part
+                    per_day_bytes = _daily_bytes_from_traffic(traffic_hour)
                 except Exception:
                     pass
-            y_gb = [max(0.0, float(per_day_bytes.get(d.strftime('%Y-%m-%d'), 0)) / 1_000_000_000.0) for d in days]
+            get_bytes = per_day_bytes.get
+            y_gb = [max(0.0, get_bytes(k, 0) / BYTES_PER_GB) for k in day_keys]
 
             # Title and label
-            label = f"{days[0].strftime('%Y-%m-%d')} → {days[-1].strftime('%Y-%m-%d')}"
-            proxy_label = _map_service_to_proxy_type(settings.decodo_service_type) or ""
+            label = f"{day_keys[0]} → {day_keys[-1]}"
+            proxy_label = settings.mapped_proxy_type or ""
             title = f"Daily usage (GB) — {proxy_label} — {label}" if proxy_label else f"Daily usage (GB) — {label}"
 
             # If no data at all, add an annotation on the chart
-            if sum(y_gb) == 0.0:
+            if not any(y_gb):
                 # Simple single-bar with annotation to avoid empty look
-                ann_days = days if len(days) <= 7 else days[:7]
-                ann_vals = [0.0 for _ in ann_days]
-                img_bytes = _render_daily_chart(ann_days, ann_vals, title=title + " (no data)")
+                ann_keys = day_keys[:7]
+                img_bytes = _render_daily_chart(ann_keys, [0.0] * len(ann_keys), title=title + " (no data)")
             else:
-                img_bytes = _render_daily_chart(days, y_gb, title=title)
+                img_bytes = _render_daily_chart(day_keys, y_gb, title=title)
             await message.answer_photo(photo=BufferedInputFile(img_bytes, filename="daily_usage.png"), reply_markup=MAIN_KB)
         except httpx.HTTPStatusError as e:
             logger.exception("Decodo API error: %s", e)
@@ -1124,37 +1367,57 @@ async def _handle_chart(message: Message, bot: Bot) -> None:
 
 
 @router.message(Command("usage"))
-async def cmd_usage(message: Message, bot: Bot) -> None:
-    await _handle_usage(message, bot)
+async def cmd_usage(message: Message, bot: Bot, settings: Settings, decodo: DecodoClient) -> None:
+    await _handle_usage(message, bot, settings, decodo)
 
 
 @router.message(Command("chart"))
-async def cmd_chart(message: Message, bot: Bot) -> None:
-    await _handle_chart(message, bot)
+async def cmd_chart(message: Message, bot: Bot, settings: Settings, decodo: DecodoClient) -> None:
+    await _handle_chart(message, bot, settings, decodo)
 
 
 @router.message()
-async def on_text_buttons(message: Message, bot: Bot) -> None:
+async def on_text_buttons(message: Message, bot: Bot, settings: Settings, decodo: DecodoClient) -> None:
     # Handle simple text buttons from reply keyboard
     if not message.text:
         return
     if message.text.strip().lower() == "usage":
-        await _handle_usage(message, bot)
+        await _handle_usage(message, bot, settings, decodo)
     elif message.text.strip().lower() in ("daily chart", "chart", "stats image", "statistic image", "daily usage"):
-        await _handle_chart(message, bot)
+        await _handle_chart(message, bot, settings, decodo)
 
 
 async def main() -> None:
-    settings = Settings()
+    settings = get_settings()
     settings.ensure_valid()
 
     bot = Bot(token=settings.telegram_bot_token)
     dp = Dispatcher()
     dp.include_router(router)
 
+    # One long-lived HTTP client keeps connections to the Decodo API alive between commands
+    http_client = new_http_client()
+    dp["settings"] = settings
+    dp["decodo"] = DecodoClient(settings.decodo_api_key, client=http_client)
+
+    # Load chart fonts off the event loop so the first /chart doesn't pay for it
+    try:
+        await asyncio.to_thread(_prewarm_chart)
+    except Exception:
+        logger.warning("Chart pre-warm failed", exc_info=True)
+
     logger.info("Bot started (aiogram)")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await http_client.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        # uvloop is optional (not available on Windows); fall back to the default loop
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
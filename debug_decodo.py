@@ -6,7 +6,7 @@ import os
 
 from dotenv import load_dotenv
 
-from bot import DecodoClient, _map_service_to_proxy_type, format_usage, _anchored_period_start
+from bot import DecodoClient, _map_service_to_proxy_type, format_usage, _anchored_period_start, _parse_date_guess
 
 
 async def main() -> None:
@@ -40,8 +40,8 @@ async def main() -> None:
         if start_date:
             # Rolling anchored window → now
             now = dt.datetime.now(dt.UTC).replace(microsecond=0)
-            start_d = _anchored_period_start(start_date, now)
-            from_date = f"{start_d.strftime('%Y-%m-%d')} 00:00:00" if start_d else ts_or_date(start_date)
+            start_d = _anchored_period_start(_parse_date_guess(start_date), now.date())
+            from_date = f"{start_d.isoformat()} 00:00:00" if start_d else ts_or_date(start_date)
             to_date = now.strftime('%Y-%m-%d %H:%M:%S')
             traffic = await client.get_traffic(
                 from_date=from_date,
@@ -51,8 +51,8 @@ async def main() -> None:
             )
             subs = {
                 'traffic_limit': limit_gb,
-                'current_period_start': start_d.strftime('%Y-%m-%d') if start_d else start_date,
-                'current_period_end': dt.datetime.now().strftime('%Y-%m-%d'),
+                'current_period_start': start_d.isoformat() if start_d else start_date,
+                'current_period_end': dt.date.today().isoformat(),
             }
         elif end_date:
             # Fixed window ending at END (legacy)
@@ -73,8 +73,8 @@ async def main() -> None:
             start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             subs = {
                 'traffic_limit': limit_gb,
-                'current_period_start': start.strftime('%Y-%m-%d'),
-                'current_period_end': now.strftime('%Y-%m-%d'),
+                'current_period_start': start.date().isoformat(),
+                'current_period_end': now.date().isoformat(),
             }
 
         print('Summary:\n', format_usage(subs, traffic))